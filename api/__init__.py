@@ -0,0 +1 @@
+# api/__init__.py
@@ -0,0 +1,146 @@
+# api/loadgen.py
+"""
+Load generator for the circulation API.
+
+    python -m api.loadgen --url http://127.0.0.1:8765 --concurrency 32 --duration 10
+
+Each worker holds one keep-alive connection and sends a mix of lookups,
+searches and (optionally) issue/return pairs, then prints requests per second
+and latency percentiles.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from urllib.parse import urlsplit, quote
+
+
+class _Conn:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = None
+        self.writer = None
+
+    async def open(self):
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method, path, payload=None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+        head = (
+            f"{method} {path} HTTP/1.1\r\n"
+            f"Host: {self.host}:{self.port}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        self.writer.write(head + body)
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value.strip())
+        data = await self.reader.readexactly(length) if length else b""
+        return status, data
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(pct / 100.0 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
+
+
+async def run_load(url, concurrency=32, duration=10.0, writes=False):
+    parts = urlsplit(url)
+    host, port = parts.hostname or "127.0.0.1", parts.port or 80
+
+    # Discover some ids/terms to query with
+    probe = _Conn(host, port)
+    await probe.open()
+    _, data = await probe.request("GET", "/books?limit=200")
+    books = json.loads(data)["results"]
+    await probe.close()
+    if not books:
+        raise SystemExit("Target has no books to query.")
+    book_ids = [b["item_id"] for b in books]
+    terms = list({w for b in books for w in b["title"].split() if len(w) > 3}) or [""]
+
+    latencies = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker(n):
+        nonlocal errors
+        conn = _Conn(host, port)
+        await conn.open()
+        roll = f"IT21B{(n % 20) + 1:03d}"
+        try:
+            while time.perf_counter() < deadline:
+                r = random.random()
+                if writes and r < 0.1:
+                    book_id = random.choice(book_ids)
+                    calls = [("POST", "/issue", {"book_id": book_id, "roll_no": roll}),
+                             ("POST", "/return", {"book_id": book_id, "roll_no": roll})]
+                elif r < 0.55:
+                    calls = [("GET", f"/books/{random.choice(book_ids)}", None)]
+                else:
+                    calls = [("GET", f"/books?q={quote(random.choice(terms))}&limit=20", None)]
+                for method, path, payload in calls:
+                    t0 = time.perf_counter()
+                    status, _ = await conn.request(method, path, payload)
+                    latencies.append(time.perf_counter() - t0)
+                    if status >= 400:
+                        errors += 1
+        finally:
+            await conn.close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p90_ms": _percentile(latencies, 90) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": (latencies[-1] * 1000) if latencies else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the circulation API")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--writes", action="store_true", help="include issue/return pairs (modifies data)")
+    args = parser.parse_args(argv)
+
+    stats = asyncio.run(run_load(args.url, args.concurrency, args.duration, args.writes))
+    print(f"requests: {stats['requests']}  errors: {stats['errors']}  time: {stats['seconds']:.2f}s")
+    print(f"throughput: {stats['rps']:.1f} req/s")
+    print(f"latency ms  p50: {stats['p50_ms']:.2f}  p90: {stats['p90_ms']:.2f}  "
+          f"p99: {stats['p99_ms']:.2f}  max: {stats['max_ms']:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+# api/server.py
+"""
+Headless HTTP/JSON circulation service for kiosks and self-checkout stations.
+
+Runs alongside the Streamlit UI against the same data directory:
+
+    python -m api.server --host 127.0.0.1 --port 8765
+
+Routes:
+    GET  /health
+    GET  /counts
+    GET  /books?q=&category=&limit=
+    GET  /books/<item_id>
+    GET  /branches/books?q=&category=&limit=     (all mounted branches)
+    GET  /branches/availability?title=&author=
+    GET  /branches/counts
+    POST /issue     {"book_id": ..., "roll_no": ..., "period_days": 14}
+    POST /return    {"book_id": ..., "roll_no": ...}
+    POST /reserve   {"book_id": ..., "roll_no": ...}
+"""
+import argparse
+import asyncio
+import json
+from urllib.parse import urlsplit, parse_qs
+
+from core.engine import LibraryEngine
+
+MAX_BODY_BYTES = 64 * 1024
+MAX_HEADERS = 100
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    411: "Length Required",
+    413: "Payload Too Large",
+    414: "URI Too Long",
+    431: "Request Header Fields Too Large",
+    500: "Internal Server Error",
+}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class CirculationServer:
+    """Minimal keep-alive HTTP/1.1 server over asyncio streams.
+
+    Engine calls never run on the event loop: reads go to worker threads (a
+    lookup is a dict hit on the store's cached index, but the first read after
+    any write re-parses the catalog). Each mutation is a read-modify-write of a
+    JSON file that the engine serializes with the data directory's file lock
+    (BranchStore.write_lock), which the Streamlit UI takes too; _write_lock only
+    keeps queued writers here from tying up worker threads while they wait.
+
+    Request bodies must carry Content-Length: chunked uploads are answered with
+    411 and the connection is closed.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8765):
+        self.host = host
+        self.port = port
+        self._write_lock = asyncio.Lock()
+        self._server = None
+
+    # ---- lifecycle ----
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_conn, self.host, self.port)
+        sock = self._server.sockets[0].getsockname()
+        self.port = sock[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    # ---- connection handling ----
+    async def _read_head(self, reader):
+        """Parse the request line and headers; None at EOF, HTTPError if malformed.
+
+        StreamReader.readline raises ValueError past the stream limit (64 KiB),
+        which is reported as 414/431 instead of dropping the connection.
+        """
+        try:
+            request_line = await reader.readline()
+        except ValueError:
+            raise HTTPError(414, "request line too long")
+        if not request_line:
+            return None
+        parts = request_line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HTTPError(400, "malformed request line")
+        method, target, version = parts
+
+        headers = {}
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                raise HTTPError(431, "header line too long")
+            if line in (b"\r\n", b"\n", b""):
+                break
+            if len(headers) >= MAX_HEADERS:
+                raise HTTPError(431, "too many headers")
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return method, target, version, headers
+
+    async def _handle_conn(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await self._read_head(reader)
+                except HTTPError as e:
+                    await self._send(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if head is None:
+                    break
+                method, target, version, headers = head
+
+                conn = headers.get("connection", "").lower()
+                keep_alive = conn != "close" if version == "HTTP/1.1" else conn == "keep-alive"
+
+                body_read = False
+                try:
+                    if "transfer-encoding" in headers:
+                        # Its body framing is unknown to us: the bytes left in the
+                        # stream can't be skipped, so the connection is closed too
+                        raise HTTPError(411, "Transfer-Encoding is not supported; send Content-Length")
+                    try:
+                        length = int(headers.get("content-length", 0) or 0)
+                    except ValueError:
+                        raise HTTPError(400, "invalid Content-Length")
+                    if length < 0:
+                        raise HTTPError(400, "invalid Content-Length")
+                    if length > MAX_BODY_BYTES:
+                        raise HTTPError(413, "request body too large")
+                    body = await reader.readexactly(length) if length else b""
+                    body_read = True
+                    status, payload = await self._dispatch(method.upper(), target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except asyncio.IncompleteReadError:
+                    raise
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+
+                # A rejected body is still unread in the stream, so the connection can't be reused
+                keep_alive = keep_alive and body_read
+                await self._send(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    @staticmethod
+    async def _send(writer, status, payload, keep_alive):
+        body = json.dumps(payload).encode("utf-8")
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            "Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n"
+        ).encode("latin-1")
+        writer.write(head + body)
+        await writer.drain()
+
+    # ---- routing ----
+    async def _dispatch(self, method, target, body):
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+        if path == "/health":
+            return 200, {"status": "ok"}
+        if path == "/counts":
+            self._require(method, "GET")
+            return 200, await asyncio.to_thread(LibraryEngine.counts)
+        if path == "/books":
+            self._require(method, "GET")
+            return 200, await asyncio.to_thread(self._search, params)
+        if path.startswith("/books/"):
+            self._require(method, "GET")
+            book = await asyncio.to_thread(LibraryEngine.get_book, path[len("/books/"):])
+            if book is None:
+                raise HTTPError(404, "book not found")
+            return 200, book.to_dict()
+        if path.startswith("/branches/"):
+            self._require(method, "GET")
+            return 200, await self._federated(path[len("/branches/"):], params)
+        if path in ("/issue", "/return", "/reserve"):
+            self._require(method, "POST")
+            return await self._circulate(path[1:], self._parse_json(body))
+        raise HTTPError(404, f"no route for {path}")
+
+    @staticmethod
+    def _require(method, expected):
+        if method != expected:
+            raise HTTPError(405, f"use {expected}")
+
+    @staticmethod
+    def _parse_json(body):
+        try:
+            data = json.loads(body or b"{}")
+        except ValueError:
+            raise HTTPError(400, "body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(400, "body must be a JSON object")
+        return data
+
+    @staticmethod
+    def _search(params):
+        try:
+            limit = int(params.get("limit", 50))
+        except ValueError:
+            raise HTTPError(400, "limit must be an integer")
+        results = LibraryEngine.search_books(params.get("q", ""), params.get("category", "All"))
+        return {"total": len(results), "results": [b.to_dict() for b in results[:max(limit, 0)]]}
+
+    @staticmethod
+    async def _federated(what, params):
+        # Fan-out waits on other threads, so keep it off the event loop
+        if what == "books":
+            try:
+                limit = int(params.get("limit", 50))
+            except ValueError:
+                raise HTTPError(400, "limit must be an integer")
+            return await asyncio.to_thread(
+                LibraryEngine.federated_search, params.get("q", ""), params.get("category", "All"), max(limit, 0))
+        if what == "availability":
+            if not params.get("title"):
+                raise HTTPError(400, "title is required")
+            return await asyncio.to_thread(
+                LibraryEngine.federated_availability, params["title"], params.get("author", ""))
+        if what == "counts":
+            return await asyncio.to_thread(LibraryEngine.federated_counts)
+        raise HTTPError(404, f"no route for /branches/{what}")
+
+    async def _circulate(self, action, data):
+        book_id = str(data.get("book_id", "")).strip()
+        roll = str(data.get("roll_no", "")).strip()
+        if not book_id or not roll:
+            raise HTTPError(400, "book_id and roll_no are required")
+        if await asyncio.to_thread(LibraryEngine.get_book, book_id) is None:
+            raise HTTPError(404, "book not found")
+        if await asyncio.to_thread(LibraryEngine.get_user, roll) is None:
+            raise HTTPError(404, "user not found")
+
+        if action == "issue":
+            try:
+                period = int(data.get("period_days", 14))
+            except (TypeError, ValueError):
+                raise HTTPError(400, "period_days must be an integer")
+            op = lambda: LibraryEngine.issue_book(book_id, roll, period)
+        elif action == "return":
+            op = lambda: LibraryEngine.return_book(book_id, roll)
+        else:
+            op = lambda: LibraryEngine.reserve_book(book_id, roll)
+
+        async with self._write_lock:
+            await asyncio.to_thread(op)
+        user = await asyncio.to_thread(LibraryEngine.get_user, roll)
+        return 200, {"ok": True, "action": action, "book_id": book_id, "user": user.to_dict()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless library circulation service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    async def run():
+        # Parse the catalog (and backfill any missing IDs) before taking traffic
+        await asyncio.to_thread(LibraryEngine.list_books)
+        server = await CirculationServer(args.host, args.port).start()
+        print(f"Circulation API listening on http://{server.host}:{server.port}")
+        await server.serve_forever()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,2 @@
-from .models import LibraryItem, Book, User
+from .models import LibraryItem, Book, User, IdAllocator, generate_numeric_id, id_timestamp, min_id_for_time
 from .engine import LibraryEngine
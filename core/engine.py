@@ -1,7 +1,10 @@
 # core/engine.py
-from persistence.store import DataStore
-from core.models import Book, User
-from typing import List, Dict
+from persistence.store import DataStore, normalize_text
+from core.models import Book, User, min_id_for_time
+from typing import List, Dict, Optional
+from collections import Counter
+import bisect
+from dataclasses import replace
 from datetime import date, timedelta, datetime
 
 FINE_PER_DAY = 10.0  # currency units per day overdue
@@ -25,6 +28,11 @@ class LibraryEngine:
     def save_users(users: List[User]):
         DataStore.save_users(users)
 
+    @staticmethod
+    def write_lock():
+        # Hold around any load-modify-save of books/users (see BranchStore.write_lock)
+        return DataStore.write_lock()
+
     @staticmethod
     def list_loans() -> List[Dict]:
         # Loans feature removed: always return empty list
@@ -35,47 +43,121 @@ class LibraryEngine:
         # Loans feature removed: no-op
         return
 
+    # --- Lookup / search ---
+    @staticmethod
+    def get_book(book_id: str) -> Optional[Book]:
+        book = DataStore.default_branch().book_index().get(book_id)
+        return replace(book) if book else None
+
+    @staticmethod
+    def get_user(user_roll: str) -> Optional[User]:
+        user = DataStore.default_branch().user_index().get(user_roll)
+        return User.from_dict(user.to_dict()) if user else None
+
+    @staticmethod
+    def search_books(query: str = "", category: str = "All", books: Optional[List[Book]] = None) -> List[Book]:
+        """Case- and whitespace-insensitive title/author match (see normalize_text),
+        optionally filtered by category.
+
+        Without `books`, searches the store's shared cached catalog: treat the
+        returned books as read-only.
+        """
+        q = normalize_text(query)
+        if books is None:
+            return LibraryEngine._search_index(DataStore.default_branch().search_index(), q, category)
+        return [
+            b for b in books
+            if (not q or q in normalize_text(b.title) or q in normalize_text(b.author))
+            and (not category or category == "All" or b.category == category)
+        ]
+
+    # --- Availability: copies not currently on a user's borrowed list ---
+    @staticmethod
+    def available_copies(books: List[Book], users: List[User]) -> Dict[str, int]:
+        borrowed = Counter(bid for u in users for bid in getattr(u, "borrowed", []))
+        return {b.item_id: max(b.copies - borrowed[b.item_id], 0) for b in books}
+
+    @staticmethod
+    def _search_index(index, q: str, category: str) -> List[Book]:
+        # Selective queries: str.find over the joined text skips non-matching books
+        # at C speed, resuming at the next book's entry after each hit. Broad
+        # queries (many hits) are cheaper as a plain scan of the per-book entries.
+        text, starts, entries, books = index
+        if not q:
+            hits = books
+        elif "\n" in q or "\0" in q:
+            hits = []
+        elif text.count(q) * 8 > len(books):
+            hits = [b for entry, b in zip(entries, books) if q in entry]
+        else:
+            hits = []
+            i = text.find(q)
+            while i != -1:
+                k = bisect.bisect_right(starts, i) - 1
+                hits.append(books[k])
+                i = text.find(q, starts[k + 1]) if k + 1 < len(starts) else -1
+        if category and category != "All":
+            hits = [b for b in hits if b.category == category]
+        return list(hits)
+
+    # --- Recently added books (IDs are time-ordered, newest = largest) ---
+    @staticmethod
+    def recent_books(limit: int = 10, since: Optional[float] = None) -> List[Book]:
+        """Newest books first, optionally only those added at/after `since` (epoch seconds).
+
+        Range scan over the store's sorted ID index; legacy (pre-allocator) IDs are
+        not time-ordered and are excluded.
+        """
+        index = DataStore.default_branch().recent_ids()
+        lo = bisect.bisect_left(index, min_id_for_time(since), key=lambda r: r[0]) if since is not None else 0
+        picked = index[max(lo, len(index) - limit):]
+        return [Book.from_dict(d) for _, d in reversed(picked)]
+
     # --- Issue a book (adds book_id to user's borrowed and create loan) ---
     @staticmethod
     def issue_book(book_id: str, user_roll: str, period_days: int = 14):
         # Issue book: only update user's borrowed list (no loan records)
-        users = LibraryEngine.list_users()
-        for u in users:
-            if u.roll_no == user_roll:
-                if book_id not in getattr(u, "borrowed", []):
-                    u.borrowed.append(book_id)
-        LibraryEngine.save_users(users)
+        with DataStore.write_lock():
+            users = LibraryEngine.list_users()
+            for u in users:
+                if u.roll_no == user_roll:
+                    if book_id not in getattr(u, "borrowed", []):
+                        u.borrowed.append(book_id)
+            LibraryEngine.save_users(users)
 
     # --- Reserve a book (create a reservation entry in loans with reserved=True) ---
     @staticmethod
     def reserve_book(book_id: str, user_roll: str):
         # Add reservation to the user's reserved list
-        users = LibraryEngine.list_users()
-        for u in users:
-            if u.roll_no == user_roll:
-                if book_id not in getattr(u, "reserved", []):
-                    u.reserved.append(book_id)
-        LibraryEngine.save_users(users)
+        with DataStore.write_lock():
+            users = LibraryEngine.list_users()
+            for u in users:
+                if u.roll_no == user_roll:
+                    if book_id not in getattr(u, "reserved", []):
+                        u.reserved.append(book_id)
+            LibraryEngine.save_users(users)
 
     @staticmethod
     def unreserve_book(book_id: str, user_roll: str):
         # Remove reservation from user's reserved list
-        users = LibraryEngine.list_users()
-        for u in users:
-            if u.roll_no == user_roll:
-                if book_id in getattr(u, "reserved", []):
-                    u.reserved.remove(book_id)
-        LibraryEngine.save_users(users)
+        with DataStore.write_lock():
+            users = LibraryEngine.list_users()
+            for u in users:
+                if u.roll_no == user_roll:
+                    if book_id in getattr(u, "reserved", []):
+                        u.reserved.remove(book_id)
+            LibraryEngine.save_users(users)
 
     @staticmethod
     def return_book(book_id: str, user_roll: str):
         """Return a book by removing it from the user's borrowed list."""
-        users = LibraryEngine.list_users()
-        for u in users:
-            if u.roll_no == user_roll:
-                if book_id in getattr(u, "borrowed", []):
-                    u.borrowed.remove(book_id)
-        LibraryEngine.save_users(users)
+        with DataStore.write_lock():
+            users = LibraryEngine.list_users()
+            for u in users:
+                if u.roll_no == user_roll:
+                    if book_id in getattr(u, "borrowed", []):
+                        u.borrowed.remove(book_id)
+            LibraryEngine.save_users(users)
         return True
 
     # Return book feature removed. To return a book, remove it from the user's
@@ -84,19 +166,20 @@ class LibraryEngine:
     # --- Delete a book by item_id ---
     @staticmethod
     def delete_book(book_id: str):
-        books = LibraryEngine.list_books()
-        books = [b for b in books if b.item_id != book_id]
-        LibraryEngine.save_books(books)
-
-        # remove from users borrowed lists
-        users = LibraryEngine.list_users()
-        changed = False
-        for u in users:
-            if book_id in getattr(u, "borrowed", []):
-                u.borrowed.remove(book_id)
-                changed = True
-        if changed:
-            LibraryEngine.save_users(users)
+        with DataStore.write_lock():
+            books = LibraryEngine.list_books()
+            books = [b for b in books if b.item_id != book_id]
+            LibraryEngine.save_books(books)
+
+            # remove from users borrowed lists
+            users = LibraryEngine.list_users()
+            changed = False
+            for u in users:
+                if book_id in getattr(u, "borrowed", []):
+                    u.borrowed.remove(book_id)
+                    changed = True
+            if changed:
+                LibraryEngine.save_users(users)
 
         # remove related loans/reservations
         loans = LibraryEngine.list_loans() or []
@@ -106,28 +189,32 @@ class LibraryEngine:
     # --- Edit book (update allowed fields) ---
     @staticmethod
     def edit_book(book_id: str, **fields):
-        books = LibraryEngine.list_books()
-        for b in books:
-            if b.item_id == book_id:
-                for k, v in fields.items():
-                    if hasattr(b, k):
-                        # Cast numeric fields to int if appropriate
-                        if k in ("year", "copies"):
-                            try:
-                                v = int(v)
-                            except Exception:
-                                # keep original if cast fails
-                                pass
-                        setattr(b, k, v)
-                break
-        LibraryEngine.save_books(books)
+        with DataStore.write_lock():
+            books = LibraryEngine.list_books()
+            for b in books:
+                if b.item_id == book_id:
+                    for k, v in fields.items():
+                        if hasattr(b, k):
+                            # Cast numeric fields to int if appropriate
+                            if k in ("year", "copies"):
+                                try:
+                                    v = int(v)
+                                except Exception:
+                                    # keep original if cast fails
+                                    pass
+                            setattr(b, k, v)
+                    break
+            LibraryEngine.save_books(books)
         return True
 
     # --- Counts summary for dashboard ---
     @staticmethod
     def counts():
-        books = LibraryEngine.list_books()
-        users = LibraryEngine.list_users()
+        branch = DataStore.default_branch()
+        return LibraryEngine._counts_for(branch.cached_books(), branch.cached_users())
+
+    @staticmethod
+    def _counts_for(books: List[Book], users: List[User]) -> Dict:
         total_copies = sum([b.copies for b in books])
         unique_titles = len(books)
         total_users = len(users)
@@ -144,6 +231,22 @@ class LibraryEngine:
             "overdue_count": overdue_count
         }
 
+    # --- Multi-branch (federated) queries, see core/federation.py ---
+    @staticmethod
+    def federated_search(query: str = "", category: str = "All", limit: int = 50, timeout: Optional[float] = None):
+        from core import federation
+        return federation.search(query, category, limit, timeout)
+
+    @staticmethod
+    def federated_availability(title: str, author: str = "", timeout: Optional[float] = None):
+        from core import federation
+        return federation.availability(title, author, timeout)
+
+    @staticmethod
+    def federated_counts(timeout: Optional[float] = None):
+        from core import federation
+        return federation.counts(timeout)
+
     # --- Overdue detection + fine calculation ---
     @staticmethod
     def _parse_date(s: str):
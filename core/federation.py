@@ -0,0 +1,190 @@
+# core/federation.py
+"""
+Fan-out queries across every mounted branch (see DataStore.mount_branch).
+
+Each branch has its own single-thread executor and at most one query in
+flight, so a hung mount can tie up only itself. Results are cached per branch
+for BRANCH_CACHE_TTL seconds. A branch that does not answer within
+FANOUT_TIMEOUT, or is still busy with an earlier, different query, is served
+from its last cached result (marked "stale") or left out (marked "timeout" /
+"busy") without waiting. An identical query already running is waited on
+rather than submitted again.
+
+Every call returns {"results": ..., "branches": {name: status}} where status is
+one of "ok", "cached", "stale", "timeout", "busy" or "error: <message>".
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Optional
+
+from core.engine import LibraryEngine
+from persistence.store import DataStore, normalize_text as _norm
+
+FANOUT_TIMEOUT = 2.0     # seconds to wait for all branches
+BRANCH_CACHE_TTL = 10.0  # seconds a branch result is reused without asking again
+# State is keyed by the mounted BranchStore, not its name, so remounting a name on
+# another directory never serves the old directory's results (see forget_branch).
+_executors = {}  # BranchStore -> single-thread executor
+_cache = {}      # (BranchStore, op, args) -> (fetched_at, result)
+_inflight = {}   # BranchStore -> ((BranchStore, op, args), Future), at most one per branch
+_lock = threading.Lock()
+
+
+def clear_cache(branch: Optional[str] = None):
+    with _lock:
+        for key in [k for k in _cache if branch is None or k[0].name == branch]:
+            del _cache[key]
+
+
+def forget_branch(branch):
+    """Drop the cache and executor of a BranchStore that was unmounted or replaced."""
+    with _lock:
+        for key in [k for k in _cache if k[0] is branch]:
+            del _cache[key]
+        _inflight.pop(branch, None)
+        ex = _executors.pop(branch, None)
+    if ex is not None:
+        # A hung query keeps its thread, but nothing waits for it any more
+        ex.shutdown(wait=False, cancel_futures=True)
+
+
+def _score(book, q):
+    if not q:
+        return 0
+    title = _norm(book.title)
+    if title == q:
+        return 4
+    if title.startswith(q):
+        return 3
+    if q in title:
+        return 2
+    return 1  # author match
+
+
+# ---------------- Per-branch queries (run on the branch's executor) ----------------
+def _search_branch(branch, q, category, limit):
+    hits = LibraryEngine._search_index(branch.search_index(), q, category)
+    available = LibraryEngine.available_copies(hits, branch.cached_users())
+    rows = []
+    for b in hits:
+        row = b.to_dict()
+        row.update(branch=branch.name, available=available[b.item_id], score=_score(b, q))
+        rows.append(row)
+    rows.sort(key=lambda r: (-r["score"], -r["available"], r["title"]))
+    return rows[:limit]
+
+
+def _availability_branch(branch, title, author):
+    books = [b for b in branch.cached_books()
+             if _norm(b.title) == title and (not author or _norm(b.author) == author)]
+    available = LibraryEngine.available_copies(books, branch.cached_users())
+    return [{"branch": branch.name, "item_id": b.item_id, "title": b.title, "author": b.author,
+             "copies": b.copies, "available": available[b.item_id]} for b in books]
+
+
+def _counts_branch(branch):
+    return LibraryEngine._counts_for(branch.cached_books(), branch.cached_users())
+
+
+_QUERIES = {
+    "search": _search_branch,
+    "availability": _availability_branch,
+    "counts": _counts_branch,
+}
+
+
+def _run(key, branch, op, args):
+    try:
+        result = _QUERIES[op](branch, *args)
+        with _lock:
+            if branch in _executors:  # not forgotten while running
+                _cache[key] = (time.monotonic(), result)
+        return result
+    finally:
+        with _lock:
+            if _inflight.get(branch, (None,))[0] == key:
+                del _inflight[branch]
+
+
+def _executor(branch):
+    ex = _executors.get(branch)
+    if ex is None:
+        ex = _executors[branch] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"branch-{branch.name}")
+    return ex
+
+
+def _fan_out(op, args, timeout=None):
+    timeout = FANOUT_TIMEOUT if timeout is None else timeout
+    results: Dict[str, object] = {}
+    status: Dict[str, str] = {}
+    pending = {}
+
+    now = time.monotonic()
+    for name, branch in DataStore.branches().items():
+        key = (branch, op, args)
+        with _lock:
+            hit = _cache.get(key)
+            if hit and now - hit[0] < BRANCH_CACHE_TTL:
+                results[name], status[name] = hit[1], "cached"
+                continue
+            running = _inflight.get(branch)
+            if running is None:
+                fut = _executor(branch).submit(_run, key, branch, op, args)
+                _inflight[branch] = (key, fut)
+            elif running[0] == key:
+                fut = running[1]
+            else:
+                # Saturated: still working on another query; don't queue behind it
+                if hit:
+                    results[name], status[name] = hit[1], "stale"
+                else:
+                    status[name] = "busy"
+                continue
+        pending[fut] = key
+
+    done, not_done = wait(pending, timeout=timeout)
+    for fut in done:
+        name = pending[fut][0].name
+        try:
+            results[name], status[name] = fut.result(), "ok"
+        except Exception as e:
+            status[name] = f"error: {e}"
+    for fut in not_done:
+        key = pending[fut]
+        name = key[0].name
+        with _lock:
+            hit = _cache.get(key)
+        if hit:
+            results[name], status[name] = hit[1], "stale"
+        else:
+            status[name] = "timeout"
+    return results, status
+
+
+# ---------------- Public API ----------------
+def search(query: str = "", category: str = "All", limit: int = 50, timeout: Optional[float] = None):
+    """Catalog search over all branches, merged and ranked; each row carries its branch."""
+    q = _norm(query)
+    per_branch, status = _fan_out("search", (q, category or "All", limit), timeout)
+    rows = [r for branch_rows in per_branch.values() for r in branch_rows]
+    rows.sort(key=lambda r: (-r["score"], -r["available"], r["title"], r["branch"]))
+    return {"results": rows[:limit], "branches": status}
+
+
+def availability(title: str, author: str = "", timeout: Optional[float] = None):
+    """Copies and available copies of one title at every branch that holds it."""
+    per_branch, status = _fan_out("availability", (_norm(title), _norm(author)), timeout)
+    rows = [r for branch_rows in per_branch.values() for r in branch_rows]
+    rows.sort(key=lambda r: (-r["available"], r["branch"]))
+    return {"results": rows, "total_available": sum(r["available"] for r in rows), "branches": status}
+
+
+def counts(timeout: Optional[float] = None):
+    """Dashboard counts per branch plus totals across the branches that answered."""
+    per_branch, status = _fan_out("counts", (), timeout)
+    totals = {}
+    for stats in per_branch.values():
+        for k, v in stats.items():
+            totals[k] = totals.get(k, 0) + v
+    return {"results": per_branch, "totals": totals, "branches": status}
@@ -0,0 +1,318 @@
+# core/importer.py
+"""
+Bulk catalog import for CSV / JSON files (donated collections, vendor catalogs).
+
+Rows are parsed and validated in a process pool, deduplicated on normalized
+(title, author, year) against both the file and the existing catalog by
+summing `copies`, and committed with a single write of books.json.
+
+CLI:
+    python -m core.importer catalog.csv [--dry-run] [--workers N]
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from core.models import Book
+from persistence.store import DataStore, normalize_text as _norm
+
+CHUNK_SIZE = 5000
+# Below this many rows a pool costs more than it saves
+PARALLEL_THRESHOLD = 20000
+MAX_YEAR = 2100
+# Field order of the record tuples workers send back (smaller to pickle than dicts)
+_RECORD_FIELDS = ("title", "author", "publisher", "year", "category", "copies")
+
+_FIELD_ALIASES = {
+    "title": "title", "book title": "title", "name": "title",
+    "author": "author", "authors": "author",
+    "publisher": "publisher",
+    "year": "year", "published": "year", "publication year": "year",
+    "category": "category", "subject": "category",
+    "copies": "copies", "qty": "copies", "quantity": "copies",
+}
+
+
+@dataclass
+class ImportReport:
+    rows_total: int = 0
+    added: int = 0
+    merged: int = 0
+    errors: List[Tuple[int, str]] = field(default_factory=list)
+
+    @property
+    def rows_valid(self):
+        return self.rows_total - len(self.errors)
+
+
+# Errors raised by parse_rows for an unreadable file (bad encoding, malformed
+# CSV/JSON, unsupported format)
+READ_ERRORS = (ValueError, csv.Error)
+
+
+# ---------------- Parsing ----------------
+def parse_rows(data, fmt: str) -> List[Dict]:
+    """Parse raw CSV/JSON (str or bytes) into a list of row dicts."""
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    fmt = fmt.lower().lstrip(".")
+    if fmt == "csv":
+        return list(csv.DictReader(io.StringIO(data)))
+    if fmt == "json":
+        rows = json.loads(data)
+        if isinstance(rows, dict):
+            rows = rows.get("books", [])
+        if not isinstance(rows, list):
+            raise ValueError("JSON import must be a list of book objects")
+        return rows
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def dedupe_key(title, author, year) -> Tuple[str, str, object]:
+    # Existing records may hold a non-numeric year (edit_book keeps the raw
+    # value when int() fails); those compare by their normalized text instead.
+    try:
+        year = _to_int(year, "year", None)
+    except ValueError:
+        year = _norm(year)
+    return (_norm(title), _norm(author), year)
+
+
+# ---------------- Validation (runs in worker processes) ----------------
+def _to_int(value, name, default):
+    if value is None or str(value).strip() == "":
+        return default
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    # Spreadsheets export whole numbers as "2019.0"; anything fractional,
+    # infinite or NaN is rejected rather than truncated.
+    try:
+        number = float(text)
+    except ValueError:
+        raise ValueError(f"{name} must be a number (got {value!r})")
+    if not number.is_integer():
+        raise ValueError(f"{name} must be a whole number (got {value!r})")
+    return int(number)
+
+
+def validate_row(row) -> Dict:
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+    clean = {}
+    for k, v in row.items():
+        key = _FIELD_ALIASES.get(str(k or "").strip().lower())
+        if key:
+            clean[key] = v.strip() if isinstance(v, str) else v
+
+    title = clean.get("title") or ""
+    if not str(title).strip():
+        raise ValueError("title is required")
+    year = _to_int(clean.get("year"), "year", 2023)
+    if not 0 < year <= MAX_YEAR:
+        raise ValueError(f"year out of range: {year}")
+    copies = _to_int(clean.get("copies"), "copies", 1)
+    if copies < 1:
+        raise ValueError(f"copies must be at least 1 (got {copies})")
+
+    return {
+        "title": str(title),
+        "author": str(clean.get("author") or "Unknown"),
+        "publisher": str(clean.get("publisher") or "Unknown"),
+        "year": year,
+        "category": str(clean.get("category") or "General"),
+        "copies": copies,
+    }
+
+
+def _validate_chunk(rows):
+    # Valid rows come back as (dedupe key, record tuple), so the parent only merges.
+    # Row numbers in the result are relative to the chunk (1-based).
+    valid, errors = [], []
+    for i, row in enumerate(rows, start=1):
+        try:
+            rec = validate_row(row)
+            valid.append((dedupe_key(rec["title"], rec["author"], rec["year"]),
+                          tuple(rec[f] for f in _RECORD_FIELDS)))
+        except (ValueError, TypeError, OverflowError) as e:
+            errors.append((i, str(e)))
+    return len(rows), valid, errors
+
+
+def _parse_validate_chunk(args):
+    # strict: a chunk that was split inside a quoted field fails ("unexpected end
+    # of data") instead of yielding a truncated row, see import_data()
+    fieldnames, text = args
+    return _validate_chunk(list(csv.DictReader(io.StringIO(text), fieldnames=fieldnames, strict=True)))
+
+
+# ---------------- CSV splitting ----------------
+def _record_end(text, start, pos):
+    """Index just past the first newline at/after `pos` that ends a CSV record begun
+    at `start`, or len(text). With RFC 4180 quoting, a newline inside a quoted field
+    always has an odd number of quotes between it and the record start."""
+    quotes = text.count('"', start, pos)
+    end = text.find("\n", pos)
+    while end != -1:
+        quotes += text.count('"', pos, end)
+        if quotes % 2 == 0:
+            return end + 1
+        pos, end = end, text.find("\n", end + 1)
+    return len(text)
+
+
+def _csv_chunks(text, start, size):
+    chunks = []
+    while start < len(text):
+        end = _record_end(text, start, min(start + size, len(text)))
+        chunks.append(text[start:end])
+        start = end
+    return chunks
+
+
+# ---------------- Pipeline ----------------
+def _use_pool(rows, workers):
+    # A single worker process only adds IPC on top of the same serial work
+    return rows >= PARALLEL_THRESHOLD and (workers or os.cpu_count() or 1) > 1
+
+
+def _collect(results, report, total, progress):
+    """Gather per-chunk (rows, valid, errors) in order, numbering rows across chunks."""
+    validated = []
+    done = 0
+    for n, valid, errors in results:
+        validated.extend(valid)
+        report.errors.extend((done + i, msg) for i, msg in errors)
+        done += n
+        if progress:
+            progress(done, max(total, done))
+    if progress and done != total:
+        progress(done, done)  # the estimate was off (blank lines, multi-line fields)
+    report.rows_total = done
+    return validated
+
+
+def _validate(fn, chunks, total, parallel, workers, report, progress):
+    if parallel:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            return _collect(pool.map(fn, chunks), report, total, progress)
+    return _collect(map(fn, chunks), report, total, progress)
+
+
+def _merge(validated, report, dry_run):
+    with DataStore.write_lock():
+        books = DataStore.load_books()
+        index = {dedupe_key(b.title, b.author, b.year): b for b in books}
+        for key, values in validated:
+            rec = dict(zip(_RECORD_FIELDS, values))
+            existing = index.get(key)
+            if existing is not None:
+                try:
+                    current = _to_int(existing.copies, "copies", 0)
+                except ValueError:
+                    current = 0  # unreadable legacy value: the imported count replaces it
+                existing.copies = current + rec["copies"]
+                report.merged += 1
+            else:
+                book = Book(**rec)
+                books.append(book)
+                index[key] = book
+                report.added += 1
+
+        if not dry_run and (report.added or report.merged):
+            DataStore.save_books(books)
+    return report
+
+
+def import_rows(
+    rows: List[Dict],
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> ImportReport:
+    """Validate, dedupe and merge `rows` into the catalog (one write unless dry_run)."""
+    report = ImportReport()
+    chunks = [rows[i:i + CHUNK_SIZE] for i in range(0, len(rows), CHUNK_SIZE)]
+    validated = _validate(_validate_chunk, chunks, len(rows), _use_pool(len(rows), workers),
+                          workers, report, progress)
+    return _merge(validated, report, dry_run)
+
+
+def import_data(
+    data,
+    fmt: str,
+    workers: Optional[int] = None,
+    dry_run: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> ImportReport:
+    """Import raw CSV/JSON (str or bytes), see import_rows().
+
+    A large CSV file is split into ranges of whole records that the worker
+    processes parse as well as validate, so only text goes to them and only
+    clean records come back. Anything else (JSON, small files, or a CSV that
+    can't be split on quote parity, e.g. one with a bare quote inside an
+    unquoted field) is parsed here by parse_rows().
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    estimate = data.count("\n")
+    if fmt.lower().lstrip(".") == "csv" and _use_pool(estimate, workers):
+        header_end = _record_end(data, 0, 0)
+        fieldnames = next(csv.reader(io.StringIO(data[:header_end])), None)
+        if fieldnames:
+            size = max(len(data) * CHUNK_SIZE // estimate, 1)
+            chunks = [(fieldnames, text) for text in _csv_chunks(data, header_end, size)]
+            report = ImportReport()
+            try:
+                validated = _validate(_parse_validate_chunk, chunks, estimate - 1, True,
+                                      workers, report, progress)
+            except csv.Error:
+                pass  # fall back to a serial parse, which reports any real error
+            else:
+                return _merge(validated, report, dry_run)
+    return import_rows(parse_rows(data, fmt), workers=workers, dry_run=dry_run, progress=progress)
+
+
+def import_file(path, **kwargs) -> ImportReport:
+    path = str(path)
+    fmt = os.path.splitext(path)[1]
+    with open(path, "rb") as f:
+        return import_data(f.read(), fmt, **kwargs)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV or JSON")
+    parser.add_argument("path")
+    parser.add_argument("--workers", type=int, default=None, help="process pool size (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="validate and report without saving")
+    args = parser.parse_args(argv)
+
+    def progress(done, total):
+        print(f"\rvalidated {done}/{total} rows", end="", file=sys.stderr, flush=True)
+
+    try:
+        report = import_file(args.path, workers=args.workers, dry_run=args.dry_run, progress=progress)
+    except (OSError,) + READ_ERRORS as e:
+        print(f"Import failed: {e}", file=sys.stderr)
+        return 1
+    print(file=sys.stderr)
+
+    for row_no, msg in report.errors[:50]:
+        print(f"row {row_no}: {msg}")
+    if len(report.errors) > 50:
+        print(f"... and {len(report.errors) - 50} more errors")
+    print(f"{report.rows_total} rows: {report.added} added, {report.merged} merged, "
+          f"{len(report.errors)} rejected{' (dry run, nothing saved)' if args.dry_run else ''}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
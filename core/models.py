@@ -1,11 +1,159 @@
 # core/models.py
 from dataclasses import dataclass, field
-import random
+import os
+import threading
+import time
 from typing import List
 
-# Generates a 15–16 digit numeric ID
+# ---------------- ID allocation ----------------
+# Snowflake-style layout packed into 53 bits, offset so every ID stays 15–16 digits:
+#   [ 40 bits ms since ID_EPOCH_MS | 8 bits node | 5 bits sequence ] + ID_OFFSET
+# IDs from one node are strictly increasing, so numeric order == creation order.
+# Past 32 IDs in a millisecond the node borrows the next one, so during a burst
+# the encoded time may lead the wall clock by up to (burst size / 32) ms.
+# 40 bits of milliseconds last until 2058.
+ID_EPOCH_MS = 1704067200000  # 2024-01-01T00:00:00Z
+ID_OFFSET = 10**14
+NODE_BITS = 8
+SEQUENCE_BITS = 5
+NODE_COUNT = 1 << NODE_BITS
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+# Node ids are leased by locking data/.node-leases/node-<n>.lock for the life of the
+# process, so concurrently running processes that share this directory never share
+# a node id. Point LIBRARY_ID_LEASE_DIR at a common directory if several hosts
+# write the same catalog. The OS drops the lock when the process exits.
+ID_LEASE_DIR = os.environ.get("LIBRARY_ID_LEASE_DIR", os.path.join("data", ".node-leases"))
+
+try:
+    import fcntl
+
+    def _try_lock(fd):
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            return False
+except ImportError:  # Windows
+    import msvcrt
+
+    def _try_lock(fd):
+        try:
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+            return True
+        except OSError:
+            return False
+
+
+class IdAllocator:
+    """Monotonic, time-sortable numeric ID generator (thread-safe, fork-safe)."""
+
+    def __init__(self, lease_dir=None):
+        # Resolved once so a later chdir cannot move the lease scope
+        self.lease_dir = os.path.abspath(lease_dir or ID_LEASE_DIR)
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self.node_id = None
+        self._lease_fd = None
+        self._last_ms = -1
+        self._saved_ms = -1
+        self._sequence = 0
+
+    def _after_fork(self):
+        # The child must not reuse the parent's node id or sequence state. Closing
+        # the inherited descriptor leaves the parent's lock in place.
+        self._lock = threading.Lock()
+        if self._lease_fd is not None:
+            try:
+                os.close(self._lease_fd)
+            except OSError:
+                pass
+        self._reset()
+
+    def _lease_node(self):
+        os.makedirs(self.lease_dir, exist_ok=True)
+        for n in range(NODE_COUNT):
+            fd = os.open(os.path.join(self.lease_dir, f"node-{n}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+            if _try_lock(fd):
+                self._lease_fd = fd
+                # Resume after any time the previous holder issued ahead of the clock
+                os.lseek(fd, 0, os.SEEK_SET)
+                saved = os.read(fd, 32).strip()
+                if saved.isdigit():
+                    # That millisecond may be fully used: continue from the next one
+                    self._last_ms = self._saved_ms = int(saved)
+                    self._sequence = MAX_SEQUENCE
+                return n
+            os.close(fd)
+        raise RuntimeError(f"No free ID node lease in {self.lease_dir} ({NODE_COUNT} processes hold one)")
+
+    def _save_high_water(self, ms):
+        # Fixed width, so the record is overwritten in place without truncating
+        os.lseek(self._lease_fd, 0, os.SEEK_SET)
+        os.write(self._lease_fd, b"%020d" % ms)
+        self._saved_ms = ms
+
+    @staticmethod
+    def _now_ms():
+        return int(time.time() * 1000) - ID_EPOCH_MS
+
+    def next_id(self):
+        with self._lock:
+            if self.node_id is None:
+                self.node_id = self._lease_node()
+            now = wall = self._now_ms()
+            # Never step backwards if the wall clock is adjusted
+            if now < self._last_ms:
+                now = self._last_ms
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted: borrow the next millisecond instead of
+                    # sleeping, so bursts and clock steps never block callers. The
+                    # encoded time runs ahead until the wall clock catches up.
+                    now = self._last_ms + 1
+            else:
+                self._sequence = 0
+            if now > wall and now > self._saved_ms:
+                # Issuing ahead of the clock: record it in the lease, so the next
+                # process to lease this node does not reissue these times
+                self._save_high_water(now)
+            self._last_ms = now
+            raw = (now << (NODE_BITS + SEQUENCE_BITS)) | (self.node_id << SEQUENCE_BITS) | self._sequence
+            return str(ID_OFFSET + raw)
+
+
+_allocator = IdAllocator()
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_allocator._after_fork)
+
+
+# Generates a 15–16 digit numeric, time-ordered ID
 def generate_numeric_id():
-    return str(random.randint(10**14, 10**16 - 1))
+    return _allocator.next_id()
+
+
+def id_timestamp(item_id):
+    """Creation time (epoch seconds) encoded in an allocator ID.
+
+    Only meaningful for IDs issued by IdAllocator; legacy random IDs decode to
+    arbitrary times (the store records those, see BranchStore.legacy_ids).
+    """
+    try:
+        raw = int(item_id) - ID_OFFSET
+    except (TypeError, ValueError):
+        return None
+    if raw < 0:
+        return None
+    return ((raw >> (NODE_BITS + SEQUENCE_BITS)) + ID_EPOCH_MS) / 1000.0
+
+
+def min_id_for_time(ts):
+    """Smallest allocator ID that could have been issued at or after `ts` (epoch seconds)."""
+    ms = max(int(ts * 1000) - ID_EPOCH_MS, 0)
+    return ID_OFFSET + (ms << (NODE_BITS + SEQUENCE_BITS))
 
 @dataclass
 class LibraryItem:
@@ -34,7 +182,9 @@ class Book(LibraryItem):
     @staticmethod
     def from_dict(d):
         return Book(
-            item_id=d.get("item_id", generate_numeric_id()),
+            # Missing IDs are left blank and backfilled (and persisted) by the store,
+            # so a record keeps the same ID across loads.
+            item_id=d.get("item_id") or "",
             title=d.get("title", ""),
             author=d.get("author", ""),
             publisher=d.get("publisher", ""),
@@ -70,6 +220,7 @@ class User:
             email=d.get("email", ""),
             roll_no=d.get("roll_no", ""),
             contact=d.get("contact", ""),
-            borrowed=d.get("borrowed", []),
-            reserved=d.get("reserved", [])
+            # Copy so mutating a User never touches the store's cached records
+            borrowed=list(d.get("borrowed", [])),
+            reserved=list(d.get("reserved", []))
         )
@@ -1 +1 @@
-from .store import DataStore
+from .store import DataStore, BranchStore
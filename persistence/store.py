@@ -1,60 +1,417 @@
 # persistence/store.py
+import hashlib
+import io
 import json
+import os
+import pickle
+import struct
+import threading
+import time
+import zlib
 from pathlib import Path
-from core.models import Book, User
+from core.models import Book, User, generate_numeric_id, _try_lock
 
 DATA_DIR = Path("data")
 BOOKS_FILE = DATA_DIR / "books.json"
 USERS_FILE = DATA_DIR / "users.json"
 LOANS_FILE = DATA_DIR / "loans.json"
 
+# Branch served by DATA_DIR. Extra campus branches can be mounted at startup with
+# LIBRARY_BRANCHES="North Campus=/srv/north/data;South Campus=/srv/south/data"
+# or at runtime with DataStore.mount_branch().
+DEFAULT_BRANCH = os.environ.get("LIBRARY_BRANCH_NAME", "Main")
+
+
+# In-process cache of parsed files: path -> (stamp, raw list), see _stamp().
+# Shared by every caller in the process (UI reruns, API service); an entry is
+# reused only while the file on disk is unchanged.
+_cache = {}
+_cache_lock = threading.Lock()
+_parse_locks = {}
+
+
+# Binary warm-start snapshots: data/.snapshot/<name>.bin holds the parsed JSON as a
+# pickle, tagged with the source file's stamp, a BLAKE2b digest of its bytes and
+# a CRC32 of the payload. If the file still has the recorded stamp it is the very
+# file the snapshot was taken from, and the JSON is not even read. Otherwise (e.g.
+# a copied or restored data directory: new inode and ctime) the snapshot is used
+# only if the source's size and digest still match; failing that the JSON is
+# re-parsed. Branch directories may be writable by others,
+# so snapshots are decoded with _PlainUnpickler, which refuses every global:
+# only lists, dicts, strings, numbers, booleans and None can come out of one.
+SNAPSHOT_DIRNAME = ".snapshot"
+_SNAPSHOT_MAGIC = b"LIBSNAP2"
+_SNAPSHOT_HEADER = struct.Struct("<8sqqQq16sI")
+
+
+class _PlainUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f"snapshot may not reference {module}.{name}")
+
 
 # ---------------- Utility functions ----------------
-def _ensure_data_folder():
-    if not DATA_DIR.exists():
-        DATA_DIR.mkdir(parents=True, exist_ok=True)
+def _ensure_data_folder(folder=DATA_DIR):
+    if not folder.exists():
+        folder.mkdir(parents=True, exist_ok=True)
 
 
-def _read(path):
-    _ensure_data_folder()
+def _stamp(path, st=None):
+    # ctime changes on every write and cannot be set by cp -p / rsync, so a
+    # same-size copy with a preserved mtime is still seen as a change
+    st = st or path.stat()
+    return (st.st_mtime_ns, st.st_size, st.st_ino, st.st_ctime_ns)
+
+
+def normalize_text(s):
+    """Casefolded, whitespace-collapsed text: what search_index() holds and is queried with."""
+    return " ".join(str(s or "").split()).casefold()
+
+
+def _digest(content):
+    return hashlib.blake2b(content, digest_size=16).digest()
+
+
+def _snapshot_path(path):
+    return path.parent / SNAPSHOT_DIRNAME / f"{path.name}.bin"
+
+
+def _read_snapshot(path):
+    """(source stamp, source digest, payload) of the snapshot for `path`, or None."""
+    try:
+        with open(_snapshot_path(path), "rb") as f:
+            blob = f.read()
+        magic, mtime_ns, size, ino, ctime_ns, digest, crc = _SNAPSHOT_HEADER.unpack_from(blob)
+        payload = memoryview(blob)[_SNAPSHOT_HEADER.size:]
+        if magic != _SNAPSHOT_MAGIC or zlib.crc32(payload) != crc:
+            return None
+        return (mtime_ns, size, ino, ctime_ns), digest, payload
+    except Exception:
+        return None
+
+
+def _decode_snapshot(payload):
+    try:
+        return _PlainUnpickler(io.BytesIO(payload)).load()
+    except Exception:
+        return None
+
+
+def _save_snapshot(path, stamp, digest, data=None, payload=None):
+    # Best effort: a missing or stale snapshot only costs a JSON parse
+    try:
+        snap = _snapshot_path(path)
+        snap.parent.mkdir(parents=True, exist_ok=True)
+        if payload is None:
+            payload = pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp = snap.with_name(f"{snap.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, *stamp, digest, zlib.crc32(payload)))
+            f.write(payload)
+        os.replace(tmp, snap)
+    except Exception:
+        pass
+
+
+def _read_stamped(path, strict=False):
+    """Parsed contents of `path` plus the stamp they belong to (None if missing).
+
+    An unreadable file also reads as (None, []) unless `strict`, which re-raises
+    the error so callers can tell it apart from a missing file.
+    """
+    _ensure_data_folder(path.parent)
     if not path.exists():
-        return []
+        return None, []
     try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        stamp = _stamp(path)
+        with _cache_lock:
+            hit = _cache.get(path)
+            parse_lock = _parse_locks.setdefault(path, threading.Lock())
+        if hit and hit[0] == stamp:
+            return hit
+        # One thread parses a changed file; concurrent readers wait for its result
+        with parse_lock:
+            with _cache_lock:
+                hit = _cache.get(path)
+            if hit and hit[0] == stamp:
+                return hit
+            snap = _read_snapshot(path)
+            data = _decode_snapshot(snap[2]) if snap and snap[0] == stamp else None
+            if data is None:
+                with open(path, "rb") as f:
+                    stamp = _stamp(path, os.fstat(f.fileno()))
+                    content = f.read()
+                digest = _digest(content)
+                if snap and snap[0][1] == len(content) and snap[1] == digest:
+                    data = _decode_snapshot(snap[2])
+                if data is not None:
+                    # Same content under a new stamp (copied or restored file):
+                    # re-tag the snapshot so the next cold start skips the hash
+                    _save_snapshot(path, stamp, digest, payload=snap[2])
+                else:
+                    data = json.loads(content)
+                    _save_snapshot(path, stamp, digest, data)
+            with _cache_lock:
+                _cache[path] = (stamp, data)
+        return stamp, data
     except Exception:
-        return []
+        if strict:
+            raise
+        return None, []
+
+
+def _read(path):
+    return _read_stamped(path)[1]
+
+
+# Structures built from a parsed file (indexes etc.), keyed (path, kind) and
+# rebuilt only when the file's stamp changes. Callers must treat them as read-only.
+_derived = {}
+
+
+def _derive(path, kind, build):
+    stamp, raw = _read_stamped(path)
+    key = (path, kind)
+    with _cache_lock:
+        hit = _derived.get(key)
+    if stamp is not None and hit and hit[0] == stamp:
+        return hit[1]
+    value = build(raw)
+    if stamp is not None:
+        with _cache_lock:
+            _derived[key] = (stamp, value)
+    return value
 
 
 def _write(path, data):
-    _ensure_data_folder()
-    with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=4)
+    _ensure_data_folder(path.parent)
+    # Write to a temp file and swap it in, so concurrent readers never see a partial file
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    content = json.dumps(data, indent=4).encode("utf-8")
+    with open(tmp, "wb") as f:
+        f.write(content)
+    os.replace(tmp, path)
+    # This process keeps the data cached; the snapshot is refreshed by the next
+    # cold read that misses, not on every mutation
+    stamp = _stamp(path)
+    with _cache_lock:
+        _cache[path] = (stamp, data)
+
+
+class _WriteLock:
+    """Re-entrant lock held across threads *and* processes (the API service and the
+    Streamlit UI share a data directory), via a lock on `path`."""
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                _ensure_data_folder(self.path.parent)
+                fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                while not _try_lock(fd):
+                    time.sleep(0.002)
+            except BaseException:
+                self._thread_lock.release()
+                raise
+            self._fd = fd
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc):
+        self._depth -= 1
+        if self._depth == 0:
+            os.close(self._fd)  # drops the file lock
+            self._fd = None
+        self._thread_lock.release()
 
 
 # ---------------- Data Store Layer ----------------
 
+class BranchStore:
+    """Books/users of one library branch, stored as JSON in its own data directory."""
+
+    def __init__(self, name, data_dir):
+        self.name = name
+        self.data_dir = Path(data_dir)
+        self.books_file = self.data_dir / "books.json"
+        self.users_file = self.data_dir / "users.json"
+        # IDs that existed before the time-ordered allocator, see _record_legacy_ids
+        self.legacy_file = self.data_dir / "legacy_ids.json"
+        self._legacy_recorded = False
+        self._write_lock = _WriteLock(self.data_dir / ".write.lock")
+
+    def write_lock(self):
+        """Hold around a load-modify-save cycle so concurrent writers, in this
+        process or another one, cannot overwrite each other's changes."""
+        return self._write_lock
+
+    def _record_legacy_ids(self):
+        # The first time a catalog is opened by this version, every ID already in it
+        # is recorded as legacy. Those were random, so they are left out of
+        # creation-order queries such as recent_ids().
+        if self._legacy_recorded:
+            return
+        if not self.legacy_file.exists():
+            try:
+                _, raw = _read_stamped(self.books_file, strict=True)
+            except Exception:
+                return  # unreadable catalog: record nothing, try again once it is repaired
+            if not isinstance(raw, list):
+                return
+            _write(self.legacy_file, sorted({str(d["item_id"]) for d in raw if isinstance(d, dict) and d.get("item_id")}))
+        self._legacy_recorded = True
+
+    def legacy_ids(self):
+        self._record_legacy_ids()
+        return _derive(self.legacy_file, "set", lambda raw: frozenset(str(i) for i in raw))
+
+    def recent_ids(self):
+        """Allocator-issued books as a list of (int id, raw record), sorted by id."""
+        legacy = self.legacy_ids()
+
+        def build(raw):
+            rows = []
+            for d in raw:
+                item_id = str(d.get("item_id") or "")
+                if item_id.isdigit() and item_id not in legacy:
+                    rows.append((int(item_id), d))
+            rows.sort(key=lambda r: r[0])
+            return rows
+
+        return _derive(self.books_file, "recent", build)
+
+    # ---- shared read-only views (rebuilt only when the file changes) ----
+    # These return the same objects to every caller; use load_books()/load_users()
+    # for copies that may be modified and saved. Indexes keep the first record
+    # for a duplicated key, like a linear search would.
+    def cached_books(self):
+        return _derive(self.books_file, "books", lambda raw: [Book.from_dict(d) for d in raw])
+
+    def cached_users(self):
+        return _derive(self.users_file, "users", lambda raw: [User.from_dict(d) for d in raw])
+
+    def book_index(self):
+        return _derive(self.books_file, "book_index",
+                       lambda raw: {b.item_id: b for b in reversed(self.cached_books()) if b.item_id})
+
+    def search_index(self):
+        """(text, starts, entries, books): "title\nauthor\0" per cached book, passed
+        through normalize_text(), also joined into one string with the offset where
+        each entry starts."""
+        def build(raw):
+            books = self.cached_books()
+            entries, starts, pos = [], [], 0
+            for b in books:
+                entry = f"{normalize_text(b.title)}\n{normalize_text(b.author)}\0"
+                starts.append(pos)
+                entries.append(entry)
+                pos += len(entry)
+            return "".join(entries), starts, entries, books
+
+        return _derive(self.books_file, "search_index", build)
+
+    def user_index(self):
+        return _derive(self.users_file, "user_index",
+                       lambda raw: {u.roll_no: u for u in reversed(self.cached_users())})
+
+    def load_books(self):
+        self._record_legacy_ids()
+        raw = _read(self.books_file)
+        books = [Book.from_dict(item) for item in raw]
+        # Backfill records saved without an ID once, so they stay stable afterwards
+        missing = [b for b in books if not b.item_id]
+        if missing:
+            for b in missing:
+                b.item_id = generate_numeric_id()
+            self.save_books(books)
+        return books
+
+    def save_books(self, books):
+        self._record_legacy_ids()
+        _write(self.books_file, [b.to_dict() for b in books])
+
+    def load_users(self):
+        raw = _read(self.users_file)
+        return [User.from_dict(item) for item in raw]
+
+    def save_users(self, users):
+        _write(self.users_file, [u.to_dict() for u in users])
+
+
+def _branches_from_env():
+    branches = {DEFAULT_BRANCH: BranchStore(DEFAULT_BRANCH, DATA_DIR)}
+    for entry in os.environ.get("LIBRARY_BRANCHES", "").split(";"):
+        name, sep, folder = entry.partition("=")
+        if sep and name.strip() and folder.strip():
+            branches[name.strip()] = BranchStore(name.strip(), folder.strip())
+    return branches
+
+
+_branches = _branches_from_env()
+
+
+def _forget_branch(branch):
+    # Federated-query state belongs to the BranchStore object; release it once the
+    # name no longer maps to that store
+    from core import federation
+    federation.forget_branch(branch)
+
+
 class DataStore:
+    """Static access to the default branch, plus the registry of mounted branches."""
+
+    # ---- BRANCHES ----
+    @staticmethod
+    def mount_branch(name, data_dir):
+        branch = BranchStore(name, data_dir)
+        old = _branches.get(name)
+        _branches[name] = branch
+        if old is not None:
+            _forget_branch(old)
+        return branch
+
+    @staticmethod
+    def unmount_branch(name):
+        if name == DEFAULT_BRANCH:
+            raise ValueError("The default branch cannot be unmounted")
+        old = _branches.pop(name, None)
+        if old is not None:
+            _forget_branch(old)
+
+    @staticmethod
+    def branches():
+        return dict(_branches)
+
+    @staticmethod
+    def default_branch():
+        return _branches[DEFAULT_BRANCH]
+
+    @staticmethod
+    def write_lock():
+        return DataStore.default_branch().write_lock()
 
     # ---- BOOKS ----
     @staticmethod
     def load_books():
-        raw = _read(BOOKS_FILE)
-        return [Book.from_dict(item) for item in raw]
+        return DataStore.default_branch().load_books()
 
     @staticmethod
     def save_books(books):
-        _write(BOOKS_FILE, [b.to_dict() for b in books])
+        DataStore.default_branch().save_books(books)
 
     # ---- USERS ----
     @staticmethod
     def load_users():
-        raw = _read(USERS_FILE)
-        return [User.from_dict(item) for item in raw]
+        return DataStore.default_branch().load_users()
 
     @staticmethod
     def save_users(users):
-        _write(USERS_FILE, [u.to_dict() for u in users])
+        DataStore.default_branch().save_users(users)
 
     # ---- LOANS ----
     @staticmethod
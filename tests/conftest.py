@@ -0,0 +1,29 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Resolved when core.models is imported; keep ID node leases out of the checkout
+os.environ.setdefault("LIBRARY_ID_LEASE_DIR", tempfile.mkdtemp(prefix="library-id-leases-"))
+
+import core  # noqa: E402  (imports core before persistence, matching the app)
+from persistence import store  # noqa: E402
+from utils import helpers  # noqa: E402
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """Run the test inside an empty working directory with clean store caches."""
+    monkeypatch.chdir(tmp_path)
+    store._cache.clear()
+    store._derived.clear()
+    monkeypatch.setattr(helpers, "_sample_data_checked", False)
+    for branch in store._branches.values():
+        branch._legacy_recorded = False
+    yield tmp_path / "data"
+    store._cache.clear()
+    store._derived.clear()
@@ -0,0 +1,88 @@
+# tests/test_api.py
+import asyncio
+import json
+
+from api.server import CirculationServer
+from core.engine import LibraryEngine
+from utils.helpers import ensure_sample_data
+
+
+async def _exchange(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split()[1])
+    length = int(next(l for l in head.decode().split("\r\n") if l.lower().startswith("content-length")).split(":")[1])
+    body = json.loads(await reader.readexactly(length))
+    writer.close()
+    return status, body
+
+
+def _run(raw):
+    async def go():
+        server = await CirculationServer(port=0).start()
+        try:
+            return await _exchange(server.port, raw)
+        finally:
+            await server.close()
+    return asyncio.run(go())
+
+
+def _post(path, payload):
+    body = json.dumps(payload).encode()
+    return _run(f"POST {path} HTTP/1.1\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+
+
+def test_issue_and_lookup(data_dir):
+    ensure_sample_data()
+    book = LibraryEngine.list_books()[0]
+    status, body = _post("/issue", {"book_id": book.item_id, "roll_no": "IT21B001"})
+    assert status == 200 and book.item_id in body["user"]["borrowed"]
+
+    status, body = _run(f"GET /books/{book.item_id} HTTP/1.1\r\n\r\n".encode())
+    assert status == 200 and body["title"] == book.title
+    assert _post("/issue", {"book_id": "nope", "roll_no": "IT21B001"})[0] == 404
+
+
+def test_oversized_header_gets_431(data_dir):
+    status, _ = _run(b"GET /health HTTP/1.1\r\nX-Big: " + b"a" * 70000 + b"\r\n\r\n")
+    assert status == 431
+
+
+def test_oversized_request_line_gets_414(data_dir):
+    status, _ = _run(b"GET /books?q=" + b"a" * 70000 + b" HTTP/1.1\r\n\r\n")
+    assert status == 414
+
+
+def test_bad_content_length_gets_400(data_dir):
+    status, body = _run(b"POST /issue HTTP/1.1\r\nContent-Length: abc\r\n\r\n")
+    assert status == 400 and "Content-Length" in body["error"]
+
+
+def test_engine_value_error_is_500_not_content_length(data_dir, monkeypatch):
+    def boom():
+        raise ValueError("engine failure")
+    monkeypatch.setattr(LibraryEngine, "counts", staticmethod(boom))
+    status, body = _run(b"GET /counts HTTP/1.1\r\n\r\n")
+    assert status == 500 and body["error"] == "engine failure"
+
+
+def test_chunked_body_is_rejected_and_connection_closed(data_dir):
+    async def go():
+        server = await CirculationServer(port=0).start()
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", server.port)
+            writer.write(b"POST /issue HTTP/1.1\r\nTransfer-Encoding: chunked\r\n\r\n"
+                         b"5\r\nhello\r\n0\r\n\r\n")
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            rest = await asyncio.wait_for(reader.read(), 2)  # EOF: no second response
+            writer.close()
+            return head, rest
+        finally:
+            await server.close()
+
+    head, rest = asyncio.run(go())
+    assert head.split()[1] == b"411" and b"Connection: close" in head
+    assert b"HTTP/1.1" not in rest
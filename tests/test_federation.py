@@ -0,0 +1,72 @@
+# tests/test_federation.py
+import threading
+
+import pytest
+
+from core import federation
+from core.engine import LibraryEngine
+from core.models import Book
+from persistence.store import DataStore
+
+
+@pytest.fixture
+def branches(data_dir, tmp_path):
+    DataStore.save_books([Book(title="Operating Systems", author="Silberschatz", copies=3)])
+    north = DataStore.mount_branch("North", tmp_path / "north")
+    north.save_books([Book(title="Operating Systems", author="Silberschatz", copies=5)])
+    hung = DataStore.mount_branch("Hung", tmp_path / "hung")
+    release = threading.Event()
+
+    def hang(*args):
+        release.wait(10)
+        return []
+
+    hung.load_books = hung.load_users = hung.cached_books = hung.cached_users = hung.search_index = hang
+    federation.clear_cache()
+    yield release
+    release.set()
+    for name in ("North", "Hung"):
+        DataStore.unmount_branch(name)
+    federation.clear_cache()
+
+
+def test_results_are_merged_with_branch(branches):
+    fed = LibraryEngine.federated_search("operating", timeout=0.3)
+    assert [(r["branch"], r["available"]) for r in fed["results"]] == [("North", 5), ("Main", 3)]
+    assert fed["branches"] == {"Main": "ok", "North": "ok", "Hung": "timeout"}
+
+
+def test_hung_branch_does_not_starve_healthy_ones(branches):
+    # More distinct queries than a shared pool would have workers
+    for i in range(20):
+        fed = LibraryEngine.federated_search(f"query {i}", timeout=0.2)
+        assert fed["branches"]["Main"] == "ok" and fed["branches"]["North"] == "ok"
+        assert fed["branches"]["Hung"] in ("timeout", "busy")
+    counts = LibraryEngine.federated_counts(timeout=0.2)
+    assert counts["branches"]["Main"] == "ok" and counts["branches"]["Hung"] == "busy"
+    assert counts["totals"]["total_copies"] == 8
+
+
+def test_federated_search_normalizes_like_local_search(data_dir):
+    DataStore.save_books([Book(title="Die Straße der Ölsardinen", author="John Steinbeck"),
+                          Book(title="GROSSE Werke", author="Anon")])
+    federation.clear_cache()
+    for q in ("Straße  der", "strasse der", "Groß", "  steinbeck "):
+        local = [b.item_id for b in LibraryEngine.search_books(q)]
+        assert local
+        assert [r["item_id"] for r in LibraryEngine.federated_search(q)["results"]] == local
+
+
+def test_remount_and_unmount_drop_branch_state(data_dir, tmp_path):
+    old = DataStore.mount_branch("East", tmp_path / "east-old")
+    old.save_books([Book(title="Old Shelf")])
+    assert LibraryEngine.federated_search("shelf")["results"][0]["title"] == "Old Shelf"
+
+    new = DataStore.mount_branch("East", tmp_path / "east-new")
+    new.save_books([Book(title="New Shelf")])
+    assert old not in federation._executors
+    assert LibraryEngine.federated_search("shelf")["results"][0]["title"] == "New Shelf"
+
+    DataStore.unmount_branch("East")
+    assert new not in federation._executors
+    assert not [k for k in federation._cache if k[0] is new]
@@ -0,0 +1,132 @@
+# tests/test_importer.py
+import csv
+
+import pytest
+
+from core import importer
+from core.importer import READ_ERRORS, import_rows, parse_rows, validate_row
+from core.models import Book
+from persistence.store import DataStore
+
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "1e400", "nan", "3.7", "abc"])
+def test_bad_copies_are_row_errors(value):
+    with pytest.raises(ValueError):
+        validate_row({"title": "T", "copies": value})
+
+
+def test_whole_number_floats_are_accepted():
+    row = validate_row({"Title": " T ", "Year": "2019.0", "Copies": "3"})
+    assert row["year"] == 2019 and row["copies"] == 3 and row["title"] == "T"
+
+
+def test_parse_csv_with_bom_and_aliases():
+    rows = parse_rows("﻿Book Title,Authors,Qty\nDSA,Lipsa,2\n".encode("utf-8"), ".csv")
+    assert validate_row(rows[0]) == {
+        "title": "DSA", "author": "Lipsa", "publisher": "Unknown",
+        "year": 2023, "category": "General", "copies": 2,
+    }
+
+
+def test_parse_json_list_or_books_key():
+    assert parse_rows('[{"title": "A"}]', "json") == [{"title": "A"}]
+    assert parse_rows('{"books": [{"title": "B"}]}', "json") == [{"title": "B"}]
+    with pytest.raises(ValueError):
+        parse_rows('"just a string"', "json")
+    with pytest.raises(ValueError):
+        parse_rows("a,b", "xlsx")
+
+
+def test_malformed_csv_is_a_read_error():
+    csv.field_size_limit(1000)
+    try:
+        with pytest.raises(READ_ERRORS):
+            parse_rows("title\n" + "x" * 5000 + "\n", "csv")
+    finally:
+        csv.field_size_limit(131072)
+
+
+def test_import_dedupes_and_merges_with_one_write(data_dir, monkeypatch):
+    DataStore.save_books([Book(title="Operating Systems", author="A. Silberschatz", year=2019, copies=7)])
+    writes = []
+    save = DataStore.save_books
+    monkeypatch.setattr(DataStore, "save_books", staticmethod(lambda books: (writes.append(1), save(books))))
+
+    report = import_rows([
+        {"title": "  operating   SYSTEMS ", "author": "a. silberschatz", "year": "2019", "copies": "2"},
+        {"title": "Compilers", "author": "Aho", "year": "2006", "copies": "1"},
+        {"title": "compilers", "author": "AHO", "year": "2006.0", "copies": "4"},
+        {"title": "Compilers", "author": "Aho", "year": "1986"},
+        {"title": "", "author": "Nobody"},
+        {"title": "Bad", "copies": "inf"},
+    ])
+
+    assert (report.rows_total, report.added, report.merged) == (6, 2, 2)
+    assert [row for row, _ in report.errors] == [5, 6]
+    assert writes == [1]
+    books = {(b.title, b.year): b.copies for b in DataStore.load_books()}
+    assert books == {("Operating Systems", 2019): 9, ("Compilers", 2006): 5, ("Compilers", 1986): 1}
+
+
+def test_dry_run_writes_nothing(data_dir):
+    report = import_rows([{"title": "A"}], dry_run=True)
+    assert report.added == 1 and DataStore.load_books() == []
+
+
+def test_existing_non_numeric_year_does_not_break_import(data_dir):
+    DataStore.save_books([Book(title="Old Tome", author="Anon", year="circa 1900", copies=1)])
+    report = import_rows([{"title": "Old Tome", "author": "Anon", "year": "1900"}, {"title": "New"}])
+    assert (report.added, report.merged, report.errors) == (2, 0, [])
+
+
+def test_parallel_validation_matches_serial(data_dir, monkeypatch):
+    monkeypatch.setattr(importer, "PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(importer, "CHUNK_SIZE", 7)
+    rows = [{"title": f"Book {i % 25}", "year": "2000", "copies": "x" if i == 30 else "1"} for i in range(60)]
+    seen = []
+    report = import_rows(rows, workers=2, progress=lambda done, total: seen.append((done, total)))
+    assert (report.added, report.merged, report.errors) == (25, 34, [(31, "copies must be a number (got 'x')")])
+    assert seen[-1] == (60, 60)
+
+
+def _catalog_after(data, fmt, **kwargs):
+    DataStore.save_books([])
+    report = importer.import_data(data, fmt, **kwargs)
+    books = sorted((b.title, b.author, b.year, b.copies) for b in DataStore.load_books())
+    return (report.rows_total, report.added, report.merged, report.errors), books
+
+
+def _sample_csv(bare_quote=False):
+    lines = ["title,author,year,copies"]
+    for i in range(80):
+        if i % 9 == 0:
+            lines.append(f'"Vol {i % 30}, ""annotated""\nedition",Anon,2001,2')
+        elif i % 13 == 0:
+            lines.append("")
+        elif i == 41:
+            lines.append("Broken,Anon,20x1,1")
+        else:
+            lines.append(f"Book {i % 30},Anon,2000,1")
+    if bare_quote:
+        lines.insert(20, 'Floppy 5" disk,Anon,1990,1')
+    return "\n".join(lines) + "\n"
+
+
+@pytest.mark.parametrize("bare_quote", [False, True])
+def test_parallel_csv_parse_matches_serial(data_dir, monkeypatch, bare_quote):
+    text = _sample_csv(bare_quote)
+    serial = _catalog_after(text, "csv", workers=1)
+    monkeypatch.setattr(importer, "PARALLEL_THRESHOLD", 10)
+    monkeypatch.setattr(importer, "CHUNK_SIZE", 7)
+    seen = []
+    parallel = _catalog_after(text.encode("utf-8"), ".csv", workers=2,
+                              progress=lambda done, total: seen.append((done, total)))
+    assert parallel == serial
+    assert serial[0][3] and seen[-1] == (serial[0][0], serial[0][0])
+
+
+def test_csv_chunks_end_on_record_boundaries():
+    text = 'a,b\n"x\ny",1\nz,2\n"p""\nq",3\n'
+    chunks = importer._csv_chunks(text, 4, 1)
+    assert "".join(chunks) == text[4:]
+    assert chunks == ['"x\ny",1\n', "z,2\n", '"p""\nq",3\n']
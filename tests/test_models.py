@@ -0,0 +1,93 @@
+# tests/test_models.py
+import multiprocessing as mp
+import time
+
+import pytest
+
+from core import models
+from core.models import IdAllocator, id_timestamp, min_id_for_time
+
+
+def _make_ids(n):
+    return [models.generate_numeric_id() for _ in range(n)]
+
+
+@pytest.fixture
+def lease_dir(tmp_path, monkeypatch):
+    path = str(tmp_path / "leases")
+    monkeypatch.setenv("LIBRARY_ID_LEASE_DIR", path)
+    monkeypatch.setattr(models._allocator, "lease_dir", path)
+    # Drop any lease taken earlier in this process so it re-leases from `path`
+    models._allocator._after_fork()
+    return path
+
+
+def test_ids_are_numeric_15_to_16_digits(lease_dir):
+    for item_id in _make_ids(1000):
+        assert item_id.isdigit() and 15 <= len(item_id) <= 16
+
+
+def test_ids_strictly_increase(tmp_path):
+    alloc = IdAllocator(str(tmp_path))
+    ids = [int(alloc.next_id()) for _ in range(20000)]
+    assert ids == sorted(set(ids))
+
+
+def test_ids_increase_when_clock_steps_back(tmp_path, monkeypatch):
+    alloc = IdAllocator(str(tmp_path))
+    ticks = iter([1000, 1000, 999, 500, 1001] + [1001] * 100)
+    monkeypatch.setattr(IdAllocator, "_now_ms", staticmethod(lambda: next(ticks)))
+    ids = [int(alloc.next_id()) for _ in range(5)]
+    assert ids == sorted(set(ids))
+
+
+def test_allocators_sharing_lease_dir_get_distinct_nodes(tmp_path):
+    a, b = IdAllocator(str(tmp_path)), IdAllocator(str(tmp_path))
+    a.next_id(), b.next_id()
+    assert a.node_id != b.node_id
+
+
+@pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="needs fork")
+def test_unique_across_forked_workers(lease_dir):
+    _make_ids(10)  # parent holds a lease and sequence state before forking
+    with mp.get_context("fork").Pool(4) as pool:
+        batches = pool.map(_make_ids, [2000] * 4)
+    ids = [i for batch in batches for i in batch] + _make_ids(2000)
+    assert len(set(ids)) == len(ids)
+
+
+def test_unique_across_spawned_processes(lease_dir):
+    with mp.get_context("spawn").Pool(3) as pool:
+        batches = pool.map(_make_ids, [2000] * 3)
+    ids = [i for batch in batches for i in batch] + _make_ids(2000)
+    assert len(set(ids)) == len(ids)
+
+
+def test_id_timestamp_roundtrip(tmp_path):
+    item_id = IdAllocator(str(tmp_path)).next_id()
+    ts = id_timestamp(item_id)
+    assert int(item_id) >= min_id_for_time(ts)
+    assert abs(ts - time.time()) < 5
+
+
+def test_no_blocking_after_clock_step_back(tmp_path, monkeypatch):
+    alloc = IdAllocator(str(tmp_path))
+    alloc.next_id()
+    now = alloc._last_ms
+    # Wall clock steps back a minute and stays there
+    monkeypatch.setattr(IdAllocator, "_now_ms", staticmethod(lambda: now - 60000))
+    started = time.monotonic()
+    ids = [int(alloc.next_id()) for _ in range(1000)]
+    assert time.monotonic() - started < 1
+    assert ids == sorted(set(ids))
+
+
+def test_next_holder_of_a_node_continues_after_ids_issued_ahead(tmp_path, monkeypatch):
+    monkeypatch.setattr(IdAllocator, "_now_ms", staticmethod(lambda: 5000))
+    first = IdAllocator(str(tmp_path))
+    ids = [first.next_id() for _ in range(500)]  # ~15 ms ahead of the clock
+    first._after_fork()  # drops the lease, as if the process had exited
+    second = IdAllocator(str(tmp_path))
+    more = [second.next_id() for _ in range(500)]
+    assert second.node_id == 0
+    assert len(set(ids + more)) == 1000
@@ -0,0 +1,169 @@
+# tests/test_store.py
+import json
+import multiprocessing as mp
+import os
+import pickle
+import shutil
+import time
+import zlib
+
+import pytest
+
+from core.engine import LibraryEngine
+from core.models import Book, id_timestamp
+from persistence import store
+from persistence.store import DataStore
+
+
+def test_missing_ids_are_backfilled_once(data_dir):
+    data_dir.mkdir()
+    (data_dir / "books.json").write_text(json.dumps([{"title": "No ID"}]))
+    first = DataStore.load_books()[0].item_id
+    assert first and DataStore.load_books()[0].item_id == first
+
+
+def test_recent_books_excludes_legacy_ids(data_dir):
+    data_dir.mkdir()
+    legacy = [{"item_id": "461920000000000", "title": "Legacy"}]  # decodes to a plausible time
+    (data_dir / "books.json").write_text(json.dumps(legacy))
+    books = DataStore.load_books()
+    books += [Book(title="First"), Book(title="Second")]
+    DataStore.save_books(books)
+
+    assert [b.title for b in LibraryEngine.recent_books()] == ["Second", "First"]
+    assert [b.title for b in LibraryEngine.recent_books(limit=1)] == ["Second"]
+
+
+def test_corrupt_catalog_records_no_legacy_ids(data_dir):
+    data_dir.mkdir()
+    legacy = json.dumps([{"item_id": "461920000000000", "title": "Legacy"}])
+    (data_dir / "books.json").write_text(legacy[:-5])  # truncated
+    assert DataStore.load_books() == []
+    assert not (data_dir / "legacy_ids.json").exists()
+
+    (data_dir / "books.json").write_text(legacy)  # repaired
+    assert [b.title for b in DataStore.load_books()] == ["Legacy"]
+    assert LibraryEngine.recent_books() == []
+
+
+def test_recent_books_since(data_dir):
+    old = Book(title="Old")
+    DataStore.save_books([old])
+    # Bursts can encode times slightly ahead of the clock; wait until it passes them
+    while time.time() < id_timestamp(old.item_id) + 0.01:
+        time.sleep(0.005)
+    cutoff = time.time()
+    DataStore.save_books(DataStore.load_books() + [Book(title="New")])
+    assert [b.title for b in LibraryEngine.recent_books(since=cutoff)] == ["New"]
+    assert [b.title for b in LibraryEngine.recent_books()] == ["New", "Old"]
+
+
+def test_lookups_use_index_and_see_writes(data_dir):
+    book = Book(title="Signals", author="Oppenheim")
+    DataStore.save_books([book])
+    found = LibraryEngine.get_book(book.item_id)
+    found.title = "changed"  # callers get a copy, not the cached object
+    assert LibraryEngine.get_book(book.item_id).title == "Signals"
+
+    LibraryEngine.edit_book(book.item_id, title="Signals and Systems")
+    assert LibraryEngine.get_book(book.item_id).title == "Signals and Systems"
+    assert LibraryEngine.get_book("missing") is None
+
+
+def test_indexed_search_matches_linear_search(data_dir):
+    DataStore.save_books([
+        Book(title="Operating Systems", author="Silberschatz", category="Computer Science"),
+        Book(title="Signals and Systems", author="Oppenheim", category="Electronics"),
+        Book(title="Thermodynamics", author="P. K. Nag", category="Mechanical"),
+    ] + [Book(title=f"Systems {i}", author="Anon", category="General") for i in range(40)])
+    books = DataStore.load_books()
+    for q, cat in [("systems", "All"), ("SILBER", "All"), ("s", "Electronics"), ("", "Mechanical"), ("zzz", "All")]:
+        expected = [b.item_id for b in LibraryEngine.search_books(q, cat, books=books)]
+        assert [b.item_id for b in LibraryEngine.search_books(q, cat)] == expected
+
+
+class _Evil:
+    def __init__(self, marker):
+        self.marker = marker
+
+    def __reduce__(self):
+        return (os.mkdir, (self.marker,))
+
+
+def _forge_snapshot(path, data):
+    # A snapshot with a valid header for the current file, carrying `data`
+    content = path.read_bytes()
+    payload = pickle.dumps(data)
+    header = store._SNAPSHOT_HEADER.pack(
+        store._SNAPSHOT_MAGIC, *store._stamp(path), store._digest(content), zlib.crc32(payload))
+    snap = store._snapshot_path(path)
+    snap.parent.mkdir(exist_ok=True)
+    snap.write_bytes(header + payload)
+
+
+def test_snapshot_is_used_when_valid(data_dir):
+    DataStore.save_books([Book(title="Real")])
+    books_file = data_dir / "books.json"
+    _forge_snapshot(books_file, [{"item_id": "1", "title": "From snapshot"}])
+    store._cache.clear()
+    assert store._read(books_file)[0]["title"] == "From snapshot"
+
+
+def test_snapshot_survives_copying_the_data_dir(data_dir, tmp_path):
+    DataStore.save_books([Book(title="Real")])
+    _forge_snapshot(data_dir / "books.json", [{"item_id": "1", "title": "From snapshot"}])
+    copy = tmp_path / "restored"
+    shutil.copytree(data_dir, copy)  # new inode and ctime, like a restored backup
+    store._cache.clear()
+    assert store._read(copy / "books.json")[0]["title"] == "From snapshot"
+
+
+def test_snapshot_cannot_run_code(data_dir, tmp_path):
+    DataStore.save_books([Book(title="Real")])
+    books_file = data_dir / "books.json"
+    marker = tmp_path / "pwned"
+    _forge_snapshot(books_file, [_Evil(str(marker))])
+    store._cache.clear()
+    assert store._read(books_file)[0]["title"] == "Real"
+    assert not marker.exists()
+
+
+def test_same_size_rewrite_with_preserved_mtime_is_detected(data_dir):
+    DataStore.save_books([Book(item_id="111111111111111", title="AAAA")])
+    books_file = data_dir / "books.json"
+    assert store._read(books_file)[0]["title"] == "AAAA"
+
+    st = books_file.stat()
+    books_file.write_bytes(books_file.read_bytes().replace(b"AAAA", b"BBBB"))
+    os.utime(books_file, ns=(st.st_atime_ns, st.st_mtime_ns))  # like cp -p / rsync -t
+    assert store._read(books_file)[0]["title"] == "BBBB"
+    store._cache.clear()  # new process: only the on-disk snapshot is left
+    assert store._read(books_file)[0]["title"] == "BBBB"
+
+
+def test_saves_leave_snapshot_to_next_cold_read(data_dir):
+    DataStore.save_books([Book(title="Real")])
+    books_file = data_dir / "books.json"
+    assert not store._snapshot_path(books_file).exists()
+    store._cache.clear()
+    assert store._read(books_file)[0]["title"] == "Real"
+    assert store._snapshot_path(books_file).exists()
+
+
+def _issue_many(args):
+    folder, roll, ids = args
+    os.chdir(folder)
+    store._cache.clear()
+    for book_id in ids:
+        LibraryEngine.issue_book(book_id, roll)
+
+
+@pytest.mark.skipif("fork" not in mp.get_all_start_methods(), reason="needs fork")
+def test_writers_in_separate_processes_do_not_lose_updates(data_dir):
+    from core.models import User
+    DataStore.save_users([User(roll_no="A"), User(roll_no="B")])
+    jobs = [(str(data_dir.parent), roll, [f"{roll}{i}" for i in range(40)]) for roll in ("A", "B")]
+    with mp.get_context("fork").Pool(2) as pool:
+        pool.map(_issue_many, jobs)
+    store._cache.clear()
+    assert {u.roll_no: len(u.borrowed) for u in DataStore.load_users()} == {"A": 40, "B": 40}
@@ -1,14 +1,15 @@
 # ui/main.py
 import streamlit as st
-import pandas as pd
-from datetime import date
 from pathlib import Path
-import io
 
 from core.engine import LibraryEngine
 from core.models import Book
+from persistence.store import DataStore
 from utils.helpers import ensure_sample_data, short_id, COLLEGE_NAME, COLLEGE_EMAIL
 
+# pandas (and the bulk importer) are imported inside the pages that use them,
+# so a cold start only pays for what the first rendered page needs.
+
 # ---------------------- CSS Loader ----------------------
 def _local_css():
     st.markdown("""
@@ -129,6 +130,14 @@ def dashboard_page():
     c5.metric("Reservations", stats["reservations"])
     c6.metric("Overdue Loans", stats["overdue_count"])
 
+    if len(DataStore.branches()) > 1:
+        st.markdown("### All Branches")
+        fed = LibraryEngine.federated_counts()
+        st.dataframe([
+            {"Branch": name, "Status": fed["branches"].get(name, ""), **fed["results"].get(name, {})}
+            for name in DataStore.branches()
+        ], use_container_width=True)
+
 
 # ---------------------- CATALOG PAGE ----------------------
 def catalog_page():
@@ -138,11 +147,9 @@ def catalog_page():
     q = st.text_input("Search Books (Title / Author)")
     cat = st.selectbox("Filter by Category", ["All"] + sorted({b.category for b in books}))
 
-    filtered = [
-        b for b in books
-        if (not q or q.lower() in b.title.lower() or q.lower() in b.author.lower())
-        and (cat == "All" or b.category == cat)
-    ]
+    filtered = LibraryEngine.search_books(q, cat, books=books)
+
+    import pandas as pd
 
     df = pd.DataFrame([{
         "Display ID": short_id(b.item_id),
@@ -156,6 +163,21 @@ def catalog_page():
 
     st.dataframe(df, use_container_width=True)
 
+    if len(DataStore.branches()) > 1 and st.checkbox("Search all branches"):
+        fed = LibraryEngine.federated_search(q, cat)
+        st.dataframe(pd.DataFrame([{
+            "Branch": r["branch"],
+            "Display ID": short_id(r["item_id"]),
+            "Title": r["title"],
+            "Author": r["author"],
+            "Year": r["year"],
+            "Copies": r["copies"],
+            "Available": r["available"],
+        } for r in fed["results"]]), use_container_width=True)
+        slow = [f"{name} ({state})" for name, state in fed["branches"].items() if state not in ("ok", "cached")]
+        if slow:
+            st.warning("Some branches did not answer in time: " + ", ".join(slow))
+
     st.markdown("### Edit or Delete Book")
     select = st.selectbox(
         "Choose a Book",
@@ -241,12 +263,32 @@ def add_book_page():
             category=category,
             copies=int(copies)
         )
-        books = LibraryEngine.list_books()
-        books.append(new)
-        LibraryEngine.save_books(books)
+        with LibraryEngine.write_lock():
+            books = LibraryEngine.list_books()
+            books.append(new)
+            LibraryEngine.save_books(books)
         st.success(f"Book added successfully (ID: {short_id(new.item_id)})")
         st.rerun()
 
+    st.markdown("### Bulk Import (CSV / JSON)")
+    st.caption("Columns: title, author, publisher, year, category, copies. "
+               "Duplicates (same title, author and year) are merged by adding copies.")
+    upload = st.file_uploader("Catalog file", type=["csv", "json"])
+    if upload is not None and st.button("Import Books"):
+        from core.importer import import_data, READ_ERRORS
+        bar = st.progress(0.0, text="Validating rows...")
+        try:
+            # Bad rows are collected in the report; only an unreadable file raises
+            report = import_data(upload.getvalue(), Path(upload.name).suffix,
+                                 progress=lambda done, total: bar.progress(done / total, text=f"Validated {done}/{total} rows"))
+        except READ_ERRORS as e:
+            st.error(f"Could not read file: {e}")
+            return
+        st.success(f"{report.rows_total} rows: {report.added} added, {report.merged} merged, {len(report.errors)} rejected.")
+        if report.errors:
+            import pandas as pd
+            st.dataframe(pd.DataFrame(report.errors, columns=["Row", "Error"]), use_container_width=True)
+
 
 # ---------------------- USERS PAGE ----------------------
 def users_page():
@@ -265,6 +307,7 @@ def users_page():
             "Reserved (IDs)": ", ".join(reserved_names),
         })
 
+    import pandas as pd
     df = pd.DataFrame(table_rows)
     st.dataframe(df, use_container_width=True)
 
@@ -321,18 +364,14 @@ def issue_page():
         return
 
     user_choice = st.selectbox("Select User", [f"{u.roll_no} - {u.name}" for u in users])
-    book_choice = st.selectbox("Select Book", [f"{short_id(b.item_id)} - {b.title}" for b in books])
+    # Options are the books themselves: display IDs are not unique, so never match on them
+    book_obj = st.selectbox("Select Book", books, format_func=lambda b: f"{short_id(b.item_id)} - {b.title}")
 
     if st.button("Issue"):
         roll = user_choice.split(" - ")[0]
-        short = book_choice.split(" - ")[0]
-        book_obj = next((b for b in books if short_id(b.item_id) == short), None)
-        if not book_obj:
-            st.error("Selected book could not be resolved. Try again.")
-        else:
-            LibraryEngine.issue_book(book_obj.item_id, roll)
-            st.success("Book issued successfully.")
-            st.rerun()
+        LibraryEngine.issue_book(book_obj.item_id, roll)
+        st.success("Book issued successfully.")
+        st.rerun()
 
 
 # ---------------------- RESERVE PAGE ----------------------
@@ -342,15 +381,13 @@ def reserve_page():
     books = LibraryEngine.list_books()
 
     u = st.selectbox("Select User", [f"{u.roll_no} - {u.name}" for u in users])
-    b = st.selectbox("Select Book", [f"{short_id(b.item_id)} - {b.title}" for b in books])
+    book_obj = st.selectbox("Select Book", books, format_func=lambda b: f"{short_id(b.item_id)} - {b.title}")
 
     if st.button("Reserve"):
-        roll = u.split(" - ")[0]
-        short = b.split(" - ")[0]
-        book_obj = next((bk for bk in books if short_id(bk.item_id) == short), None)
         if not book_obj:
-            st.error("Selected book could not be resolved. Try again.")
+            st.error("No book selected.")
         else:
+            roll = u.split(" - ")[0]
             LibraryEngine.reserve_book(book_obj.item_id, roll)
             st.success("Book reserved.")
             st.rerun()
@@ -358,5 +395,6 @@ def reserve_page():
 
 # ---------------------- CSV Export Helper ----------------------
 def convert_to_csv(data):
+    import pandas as pd
     df = pd.DataFrame(data)
     return df.to_csv(index=False).encode("utf-8")
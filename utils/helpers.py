@@ -7,11 +7,24 @@ COLLEGE_NAME = "IT College of Engineering, Delhi"
 COLLEGE_EMAIL = "library@itcollege.ac.in"
 
 def short_id(s):
-    """Display-friendly ID: last 6 digits of numeric ID (string)."""
+    """Display-friendly ID: last 6 digits of numeric ID (string).
+
+    For display only: allocator IDs sharing a node and sequence repeat their last
+    6 digits every ~15.6 s, so never look a book up by this value.
+    """
     s = str(s)
     return s[-6:]
 
+# Streamlit reruns the script on every interaction; the sample-data check only
+# needs to happen once per process.
+_sample_data_checked = False
+
 def ensure_sample_data():
+    global _sample_data_checked
+    if _sample_data_checked:
+        return
+    _sample_data_checked = True
+
     books = DataStore.load_books()
     if books:
         return